@@ -11,13 +11,52 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.     
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import itertools
 import json
+import os
 import requests
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from typing import AbstractSet
+from typing import Any
+from typing import ClassVar
+from requests.adapters import HTTPAdapter
 from FpsSet import FpsSet
-from jsonschema import validate
+from jsonschema.exceptions import best_match
+from jsonschema.protocols import Validator
+from jsonschema.validators import validator_for
+try:
+    import jsonschema_rs
+except ImportError:
+    jsonschema_rs = None  # type: ignore[assignment]
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+from urllib.parse import urljoin
 from urllib.request import urlopen
 from urllib.request import Request
-from publicsuffix2 import PublicSuffixList
+from publicsuffix2 import PublicSuffixList  # type: ignore[import-untyped]
+
+# The number of sites fetched concurrently by the network checks
+MAX_WORKERS = 32
+
+
+def loads_json(data):
+    """Parses a JSON document from a str or bytes object
+
+    Uses orjson when it is installed, since it parses much faster than the 
+    json module, and falls back to json.loads otherwise.
+
+    Args:
+        data: the str or bytes to parse
+    Returns:
+        the parsed JSON object
+    """
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
 class FpsCheck:
@@ -29,42 +68,106 @@ class FpsCheck:
     submitted first party sets
     etlds: A string of effective top level domains read from public suffix list
     icanns: A set of domains associated with country codes
+    icanns_with_com: icanns, plus com
     schema: Static. Stores schema for format the canonical_sites should follow
     error_list: Stores all exceptions and issues generated by the checks. This
                 allows the issues to be shared in full when iterated through
                 without any given check failing halfway through and not 
                 catching other issues. 
+    session: A requests.Session shared by the network checks, so that 
+             connections to a host are kept alive and reused across requests
+    eTLD_Plus1_cache: Stores whether each site looked up by is_eTLD_Plus1 has
+                      a public suffix, so that each site is only looked up once
+    well_known_cache: Stores the outcome of loading each well-known url, so 
+                      that every url is fetched at most once per FpsCheck
+    _schema_validators: Static. Caches the jsonschema validator, and the 
+                jsonschema_rs validator when it is installed, for each schema 
+                file, keyed by its path and modification time.
   """
 
-    def __init__(self, fps_sites: json, etlds: PublicSuffixList, icanns: set):
+    _schema_validators: ClassVar[
+        dict[tuple[str, float], tuple[Validator, Any]]] = {}
+
+    def __init__(self, fps_sites: dict[str, Any], etlds: PublicSuffixList, 
+                 icanns: set[str]):
         """Stores the input from canonical_sites, effective_tld_names.dat, and 
         ICANN_domains into the FpsCheck object"""
-        self.acceptable_fields = set(
+        self.acceptable_fields = frozenset(
             ["ccTLDs", "primary", "associatedSites", "serviceSites"])
         self.fps_sites = fps_sites
         self.etlds = etlds
         self.icanns = icanns
-        self.error_list = []
+        # Aliases of a site with a country code may also use .com
+        self.icanns_with_com = frozenset(icanns | {"com"})
+        self.error_list: list[str] = []
+        self.eTLD_Plus1_cache: dict[str, bool] = {}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=64, pool_maxsize=MAX_WORKERS, 
+                              max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.well_known_cache: dict[str, Future] = {}
+        self.well_known_lock = threading.Lock()
 
     def validate_schema(self, schema_file):
         """Validates the canonical sites list
 
-        Calls the validate function from the jsonschema package on the input 
-        from canonical_sites against our predertermined schema
+        Validates the input from canonical_sites against our predetermined
+        schema, using validators that are built once and reused for as long as
+        schema_file is unchanged. If jsonschema_rs is installed, its compiled 
+        validator checks the input first, and valid input is accepted without
+        running the much slower jsonschema validator. That validator is only 
+        run to pick the error to report.
 
         Args:
-            self
+            schema_file: path to the JSON schema the canonical sites list 
+            should follow
         Returns:
             None
         Raises:
             jsonschema.exceptions.ValidationError if the schema does not match 
-            the format stored in SCHEMA 
+            the format stored in schema_file
         """
-        with open(schema_file) as f:
-            SCHEMA = json.loads(f.read())
-        validate(self.fps_sites, schema = SCHEMA)
+        validator, native_validator = self.get_schema_validator(schema_file)
+        if native_validator and native_validator.is_valid(self.fps_sites):
+            return
+        # Report the same error jsonschema.validate would, not just the first
+        error = best_match(validator.iter_errors(self.fps_sites))
+        if error is not None:
+            raise error
+
+    @classmethod
+    def get_schema_validator(cls, schema_file):
+        """Returns the validators for the schema stored in schema_file
+
+        Loads schema_file, checks that it is a valid schema, and builds a 
+        jsonschema validator for the draft it is written in, along with a 
+        compiled jsonschema_rs validator if that package is installed. The 
+        result is cached on the class by the path and modification time of 
+        schema_file, so repeated checks against the same schema do not re-read
+        or re-build them.
 
-    def load_sets(self):
+        Args:
+            schema_file: path to the JSON schema
+        Returns:
+            a tuple of the jsonschema validator and the jsonschema_rs 
+            validator, or None in its place if jsonschema_rs is not installed
+        """
+        key = (os.path.abspath(schema_file), os.path.getmtime(schema_file))
+        validators = cls._schema_validators.get(key)
+        if validators is None:
+            with open(schema_file, 'rb') as f:
+                SCHEMA = loads_json(f.read())
+            validator_class = validator_for(SCHEMA)
+            validator_class.check_schema(SCHEMA)
+            native_validator = None
+            if jsonschema_rs:
+                native_validator = jsonschema_rs.validator_for(SCHEMA)
+            validators = (validator_class(SCHEMA), native_validator)
+            cls._schema_validators[key] = validators
+        return validators
+
+    def load_sets(self) -> dict[str, FpsSet]:
         """Loads sets from the JSON file into a dictionary of primary->FpsSet
 
         Loads the sets from fps_list into check_sets, a dictionary of 
@@ -77,23 +180,23 @@ class FpsCheck:
         Returns:
             a dictionary of string->FpsSet
         """
-        check_sets = {}
-        load_sets_errors = []
+        check_sets: dict[str, FpsSet] = {}
+        load_sets_errors: list[str] = []
         for fpset in self.fps_sites['sets']:
             primary = fpset.get('primary', None)
             ccTLDs = fpset.get('ccTLDs', None)
             associated_sites = fpset.get('associatedSites', None)
             service_sites = fpset.get('serviceSites', None)
-            if primary in check_sets.keys():
+            if primary in check_sets:
                 load_sets_errors.append(
-                    primary + " is already a primary of another site")
+                    f"{primary} is already a primary of another site")
             else:
                 check_sets[primary] = FpsSet(
                     ccTLDs, primary, associated_sites, service_sites)
-        self.error_list += load_sets_errors
+        self.error_list.extend(load_sets_errors)
         return check_sets
 
-    def has_all_rationales(self, check_sets):
+    def has_all_rationales(self, check_sets: dict[str, FpsSet]) -> None:
         """Checks for the presence of all rationaleBySite elements in schema
 
         Reads the associated sites and service sites from all FpsSets, and 
@@ -108,77 +211,62 @@ class FpsCheck:
             None
         """
         for fpset in self.fps_sites['sets']:
-            sites = check_sets[fpset.get("primary")].associated_sites
-            service_sites = check_sets[fpset.get("primary")].service_sites
-            if sites:
-                sites = sites + service_sites if service_sites else sites
-            else:
-                sites = service_sites
+            fps = check_sets[fpset.get("primary")]
             rationales = fpset.get('rationaleBySite', None)
-            if sites and rationales!=None:
-                for site in sites:
-                    if site not in rationales.keys():
+            if rationales is not None:
+                for site in itertools.chain(fps.associated_sites or (), 
+                                            fps.service_sites or ()):
+                    if site not in rationales:
                         self.error_list.append(
-                            "There is no provided rationale for " + site)
-            if sites!=None and rationales == None:
+                            f"There is no provided rationale for {site}")
+            # A set needs a rationaleBySite field if it has associated sites,
+            # or if it lists serviceSites at all, even an empty list
+            elif fps.associated_sites or (fps.service_sites is not None):
                 self.error_list.append(
                     "A rationaleBySite field is required for this set, but"
-                    + " none is provided. ")
+                    " none is provided. ")
 
-    def check_exclusivity(self, check_sets):
+    def check_exclusivity(self, check_sets: dict[str, FpsSet]) -> None:
         """This method checks for exclusivity of each field in a set of FpsSets
 
         Ensures that no FpsSets intersect, e.g. a primary of one set cannot be 
         an associated site of another, nor can it be the primary of another set
         etc. If any sets intersect, information about the intersections is 
-        added to the error_list.
+        added to the error_list, along with the primary of the set that 
+        first registered the site.
 
         Args:
             check_sets: a dictionary of primary->FpsSet
         Returns:
             None
         """
-        site_list = set()
-        for primary in check_sets.keys():
-            fps = check_sets[primary]
-            # Check the primary
-            if primary in site_list:
-                self.error_list.append(
-                    "This primary is already registered in another first party"
-                    + " set: " + primary)
-            else:
-                site_list.update(primary)
-            # Check the associated sites
-            if fps.associated_sites:
-                associated_overlap = set(fps.associated_sites) & site_list
-                if associated_overlap:
-                    self.error_list.append(
-                        "These associated sites are already registered in " + 
-                        "another first party set: " + str(associated_overlap))
-                else:
-                    site_list.update(fps.associated_sites)
-            # Check the service sites
-            if fps.service_sites:
-                service_overlap = set(fps.service_sites) & site_list
-                if service_overlap:
-                    self.error_list.append(
-                        "These service sites are already registered in another"
-                        + " first party set: " + str(service_overlap))
-                else:
-                    site_list.update(fps.service_sites)
-            # Check the ccTLDs
-            if fps.ccTLDs:
-                for aliased_site in fps.ccTLDs.keys():
-                    alias_sites = fps.ccTLDs[aliased_site]
-                    alias_overlap = set(alias_sites) & site_list
-                    if alias_overlap:
+        owners: dict[str, tuple[str, str]] = {}
+        for primary, fps in check_sets.items():
+            site_groups = [
+                ("primary", [primary]),
+                ("associated site", fps.associated_sites or []),
+                ("service site", fps.service_sites or []),
+                ("ccTLD site", itertools.chain.from_iterable(
+                    fps.ccTLDs.values()) if fps.ccTLDs else [])
+            ]
+            for site_type, sites in site_groups:
+                for site in sites:
+                    # Record the first set and field to claim each site, so
+                    # that the error can name where it is already registered
+                    if site not in owners:
+                        owners[site] = (primary, site_type)
+                        continue
+                    owner, owner_type = owners[site]
+                    if owner != primary:
                         self.error_list.append(
-                            "These ccTLD sites are already registered in "
-                            + "another first party set: " + str(alias_overlap))
+                            f"This {site_type} is already registered in the "
+                            f"first party set for {owner}: {site}")
                     else:
-                        site_list.update(alias_sites)
+                        self.error_list.append(
+                            f"This {site_type} is already listed in the same "
+                            f"first party set ({owner_type}): {site}")
 
-    def url_is_https(self, site):
+    def url_is_https(self, site: str) -> bool:
         """A function that checks for https://
 
         Reads a domain name and returns whether or not it begins with https://
@@ -190,7 +278,7 @@ class FpsCheck:
         """
         return site.startswith("https://")
 
-    def find_non_https_urls(self, check_sets):
+    def find_non_https_urls(self, check_sets: dict[str, FpsSet]) -> None:
         """Checks for https:// in all sites. 
 
         Calls url_is_https on all sites in each FpsSet contained in check_sets,
@@ -201,54 +289,59 @@ class FpsCheck:
         Returns:
             None
         """
-        for primary in check_sets:
+        for primary, fps in check_sets.items():
             # Apply to the primary
             if not self.url_is_https(primary):
                 self.error_list.append(
-                    "The provided primary site does not begin with https:// " 
-                    + primary)
+                    "The provided primary site does not begin with https:// "
+                    f"{primary}")
             # Apply to the country codes
-            if check_sets[primary].ccTLDs:
-                for alias in check_sets[primary].ccTLDs:
+            if fps.ccTLDs:
+                for alias, aliased_sites in fps.ccTLDs.items():
                     if not self.url_is_https(alias):
                         self.error_list.append(
-                            "The provided alias does not begin with https:// " 
-                            + alias)
-                    for aliased_site in check_sets[primary].ccTLDs[alias]:
+                            "The provided alias does not begin with https:// "
+                            f"{alias}")
+                    for aliased_site in aliased_sites:
                         if not self.url_is_https(aliased_site):
                             self.error_list.append(
-                                "The provided alias site does not begin with" +
-                                " https:// " + aliased_site)
+                                "The provided alias site does not begin with"
+                                f" https:// {aliased_site}")
             # Apply to associated sites
-            if check_sets[primary].associated_sites:
-                for associated_site in check_sets[primary].associated_sites:
+            if fps.associated_sites:
+                for associated_site in fps.associated_sites:
                     if not self.url_is_https(associated_site):
                         self.error_list.append(
                             "The provided associated site does not begin with"
-                             + " https:// " + associated_site)
+                            f" https:// {associated_site}")
             # Apply to service sites
-            if check_sets[primary].service_sites:
-                for service_site in check_sets[primary].service_sites:
+            if fps.service_sites:
+                for service_site in fps.service_sites:
                     if not self.url_is_https(service_site):
                         self.error_list.append(
                             "The provided service site does not begin with"
-                            + " https:// " + service_site)
+                            f" https:// {service_site}")
 
-    def is_eTLD_Plus1(self, site):
+    def is_eTLD_Plus1(self, site: str) -> bool:
         """A helper function for checking if a domain is etld+1 compliant
 
         calls get_public suffix from the publicsuffix2 package on the provided
         domain name, returns true if the domain name contains a public suffix,
-        else false
+        else false. Results are cached in eTLD_Plus1_cache, since the same site
+        is often checked both as a member and as a ccTLD alias.
 
         Args:
             site: a string corresponding to a domain name
         Returns:
             boolean with truth value dependent on value of get_public_suffix
         """
-        return self.etlds.get_public_suffix(site, strict=True) is not None
+        if site not in self.eTLD_Plus1_cache:
+            self.eTLD_Plus1_cache[site] = self.etlds.get_public_suffix(
+                site, strict=True) is not None
+        return self.eTLD_Plus1_cache[site]
 
-    def find_invalid_eTLD_Plus1(self, check_sets):
+    def find_invalid_eTLD_Plus1(self, 
+                                check_sets: dict[str, FpsSet]) -> None:
         """Checks if all domains are etld+1 compliant
 
         Calls is_eTLD_Plus1 on all sites in each FpsSet contained in check_sets
@@ -259,45 +352,45 @@ class FpsCheck:
         Returns:
             None
         """
-        for primary in check_sets:
+        for primary, fps in check_sets.items():
             # Apply to the primary
             if not self.is_eTLD_Plus1(primary):
                 self.error_list.append(
-                    "The provided primary site does not have an eTLD in the" +
-                    " Public suffix list: " + primary)
+                    "The provided primary site does not have an eTLD in the"
+                    f" Public suffix list: {primary}")
             # Apply to the country codes
-            if check_sets[primary].ccTLDs:
-                for alias in check_sets[primary].ccTLDs:
+            if fps.ccTLDs:
+                for alias, aliased_sites in fps.ccTLDs.items():
                     if not self.is_eTLD_Plus1(alias):
                         self.error_list.append(
                             "The provided alias does not have an eTLD in the "
-                            + "Public suffix list: " + alias)
-                    for aliased_site in check_sets[primary].ccTLDs[alias]:
+                            f"Public suffix list: {alias}")
+                    for aliased_site in aliased_sites:
                         if not self.is_eTLD_Plus1(aliased_site):
                             self.error_list.append(
                                 "The provided aliased site does not have an "
-                                + "eTLD in the Public suffix list: " + 
-                                aliased_site)
+                                "eTLD in the Public suffix list: "
+                                f"{aliased_site}")
             # Apply to associated sites
-            if check_sets[primary].associated_sites:
-                for associated_site in check_sets[primary].associated_sites:
+            if fps.associated_sites:
+                for associated_site in fps.associated_sites:
                     if not self.is_eTLD_Plus1(associated_site):
                         self.error_list.append(
-                            "The provided associated site does not have an " +
-                            "eTLD in the Public suffix list: " + 
-                            associated_site)
+                            "The provided associated site does not have an "
+                            "eTLD in the Public suffix list: "
+                            f"{associated_site}")
             # Apply to service sites
-            if check_sets[primary].service_sites:
-                for service_site in check_sets[primary].service_sites:
+            if fps.service_sites:
+                for service_site in fps.service_sites:
                     if not self.is_eTLD_Plus1(service_site):
                         self.error_list.append(
-                            "The provided service site does not have an eTLD " 
-                            + "in the Public suffix list: " + service_site)
+                            "The provided service site does not have an eTLD "
+                            f"in the Public suffix list: {service_site}")
 
     def open_and_load_json(self, url):
         """Calls urlopen and returns json from a site
 
-        Calls urlopena and json.load on a domain. Returns the json object.
+        Calls urlopen and loads_json on a domain. Returns the json object.
         This functionality is separated out here to make testing easier.
         
         Args:
@@ -305,110 +398,174 @@ class FpsCheck:
         """
         req = Request(url=url, headers={'User-Agent': 'Chrome'})
         with urlopen(req) as json_file:
-            return json.load(json_file)
+            return loads_json(json_file.read())
+
+    def load_well_known(self, url):
+        """Returns the json from a site, fetching each url only once
+
+        Calls open_and_load_json the first time a url is requested and stores
+        the result in well_known_cache. Later requests for the same url, 
+        including ones made concurrently from other threads, wait for and 
+        reuse that result. Failures are cached as well, and the same exception
+        is raised again for every request of that url.
 
-    def check_list_sites(self, primary, site_list):
-        """Checks that sites in a given list have the correct primary on their 
-        well-known page
-        
-        Calls urlopen on a given list of sites, reads their json, and adds any
-        sites that do not contain the passed in primary as their listed primary
-        to the error list. Also catches and adds any exceptions when trying to
-        open or read the url
-        
         Args:
-            primary: the domain name of the primary site
-            site_list: a list of domain names to access
+            url: a domain that we want to load the json from
         Returns:
-            None
+            the json object loaded from url
         """
-        for site in site_list:
-            url = site + "/.well-known/first-party-set.json"
+        with self.well_known_lock:
+            future = self.well_known_cache.get(url)
+            is_first_request = future is None
+            if is_first_request:
+                future = Future()
+                self.well_known_cache[url] = future
+        if is_first_request:
             try:
-                json_schema = self.open_and_load_json(url)
-                if 'primary' not in json_schema.keys():
-                    self.error_list.append(
-                        "The listed associated site site did not have primary"
-                        + " as a key in its .well-known/first-party-set.json file: "
-                        + site)
-                elif json_schema['primary'] != primary:
-                    self.error_list.append("The listed associated site "
-                    + "did not have " + primary + " listed as its primary: " 
-                    + site)
+                future.set_result(self.open_and_load_json(url))
             except Exception as inst:
-                self.error_list.append(
-                    "Experienced an error when trying to access " + url + "; "
-                    + "error was: " + str(inst))
+                future.set_exception(inst)
+        return future.result()
+
+    def run_concurrently(self, fn, *iterables):
+        """Calls fn on each item of iterables using a pool of threads
+
+        The network checks spend almost all of their time waiting on responses,
+        so they are run in parallel and their results collected in order.
+
+        Args:
+            fn: the function to call
+            iterables: the arguments to pass to fn, as in map
+        Returns:
+            a list of the results of fn, in the order of iterables
+        """
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            return list(executor.map(fn, *iterables))
+
+    def check_site_well_known(self, primary, site):
+        """Checks that a site has the correct primary on its well-known page
+
+        Args:
+            primary: the domain name of the primary site
+            site: the domain name to access
+        Returns:
+            a list of the errors found for site
+        """
+        url = f"{site}/.well-known/first-party-set.json"
+        try:
+            json_schema = self.load_well_known(url)
+            if 'primary' not in json_schema:
+                return ["The listed associated site site did not have primary"
+                    " as a key in its .well-known/first-party-set.json file: "
+                    f"{site}"]
+            elif json_schema['primary'] != primary:
+                return ["The listed associated site "
+                f"did not have {primary} listed as its primary: {site}"]
+        except Exception as inst:
+            return [f"Experienced an error when trying to access {url}; "
+                f"error was: {inst}"]
+        return []
+
+    def check_primary_well_known(self, curr_fps_set):
+        """Checks the well-known page of a primary against its FpsSet
+
+        Args:
+            curr_fps_set: the FpsSet whose primary's page should be checked
+        Returns:
+            a list of the errors found for the primary
+        """
+        errors = []
+        url = f"{curr_fps_set.primary}/.well-known/first-party-set.json"
+        # Read the well-known files and check them against the schema we 
+        # have stored
+        try:
+            json_schema = self.load_well_known(url)
+            # Compare fields in the order they appear in the well-known file
+            for field in json_schema:
+                if field not in self.acceptable_fields:
+                    continue
+                if field == "primary":
+                    if json_schema["primary"] != curr_fps_set.primary:
+                        field_sym_difference = [json_schema["primary"], 
+                        curr_fps_set.primary]
+                    else:
+                        field_sym_difference = []
+                else:
+                    field_sym_difference = set(json_schema[field]) ^ set(
+                    curr_fps_set.relevant_fields_dict[field])
+                    if field == 'ccTLDs':
+                        for aliased_site in json_schema[field]:
+                            field_sym_difference.update(
+                                set(json_schema[field][aliased_site]) ^ 
+                                set(
+                                curr_fps_set.relevant_fields_dict[field]
+                                [aliased_site]))
+                if field_sym_difference:
+                    errors.append(f"The following member(s) of {field} "
+                    "were not present in both the changelist and "
+                    ".well-known/first-party-set.json file: "
+                    f"{sorted(field_sym_difference)}")
+        except Exception as inst:
+            errors.append(
+                f"Experienced an error when trying to access {url}"
+                f"; error was: {inst}")
+        return errors
     
+    def prefetch_well_known(self, sites):
+        """Loads the well-known pages of a list of sites into well_known_cache
+
+        Fetches all of the pages in one concurrent batch, so that checks run 
+        afterwards read them from the cache instead of waiting on each set's 
+        sites in turn. Failures are cached by load_well_known and reported by
+        the checks that read them.
+
+        Args:
+            sites: a list of domain names whose well-known pages to load
+        Returns:
+            None
+        """
+        def prefetch(site):
+            try:
+                self.load_well_known(
+                    f"{site}/.well-known/first-party-set.json")
+            except Exception:
+                pass
+        self.run_concurrently(prefetch, sites)
+
     def find_invalid_well_known(self, check_sets):
         """Checks for and validates well-known pages for FPS sets
 
         Checks for a ./well-known page for first party sets under each
         domain, and checks that the format of the file aligns with the provided
         pages in the canonical list.
-        Calls check_list_sites on all ccTLDs, associated, and service sites.
-        Appends to the error_list whenever a site is unreachable, an incorrect
-        format, or its contents do no match what is expected.
+        Calls check_site_well_known on all ccTLDs, associated, and service 
+        sites. Appends to the error_list whenever a site is unreachable, an 
+        incorrect format, or its contents do no match what is expected.
+        All of the pages are fetched up front by prefetch_well_known.
 
         Args:
             check_sets: a dictionary of primary->FpsSet
         Returns:
             None
         """
-        # Check the schema to ensure consistency
-        for primary in check_sets:
-            # First we check the primary sites
-            url = primary + "/.well-known/first-party-set.json"
-            # Read the well-known files and check them against the schema we 
-            # have stored
-            try:
-                json_schema = self.open_and_load_json(url)
-                schema_fields = set(self.acceptable_fields) & set(
-                    json_schema.keys())
-                curr_fps_set = check_sets[primary]
-                for field in schema_fields:
-                    if field == "primary":
-                        if json_schema["primary"] != curr_fps_set.primary:
-                            field_sym_difference = [json_schema["primary"], 
-                            curr_fps_set.primary]
-                        else:
-                            field_sym_difference = []
-                    else:
-                        field_sym_difference = set(json_schema[field]) ^ set(
-                        curr_fps_set.relevant_fields_dict[field])
-                        if field == 'ccTLDs':
-                            for aliased_site in json_schema[field]:
-                                field_sym_difference.update(
-                                    set(json_schema[field][aliased_site]) ^ 
-                                    set(
-                                    curr_fps_set.relevant_fields_dict[field]
-                                    [aliased_site]))
-                    if field_sym_difference:
-                        self.error_list.append("The following member(s) of " 
-                        + field + " were not present in both the changelist "
-                        + "and .well-known/first-party-set.json file: " + 
-                        str(sorted(field_sym_difference)))
-            except Exception as inst:
-                self.error_list.append(
-                    "Experienced an error when trying to access " + url + 
-                    "; error was: " + str(inst))
-            # Check the member sites -
-            # Now we check the associated sites
-            if check_sets[primary].associated_sites:
-                self.check_list_sites(
-                    primary, check_sets[primary].associated_sites)
-            # Now we check the service sites
-            if check_sets[primary].service_sites:
-                self.check_list_sites(
-                    primary, check_sets[primary].service_sites)
-            # Now we check the ccTLDs
-            if check_sets[primary].ccTLDs:
-                ccTLD_sites = []
-                for aliased_site in check_sets[primary].ccTLDs:
-                    ccTLD_sites += check_sets[primary].ccTLDs[aliased_site]
-                    self.check_list_sites(primary, ccTLD_sites)
-
-    def find_invalid_alias_eSLDs(self, check_sets):
+        member_sites = {}
+        for primary, fps in check_sets.items():
+            member_sites[primary] = [
+                *(fps.associated_sites or []), *(fps.service_sites or []),
+                *itertools.chain.from_iterable((fps.ccTLDs or {}).values())]
+        self.prefetch_well_known(
+            [*check_sets, *itertools.chain.from_iterable(
+                member_sites.values())])
+        for primary, fps in check_sets.items():
+            # First we check the primary site
+            self.error_list.extend(self.check_primary_well_known(fps))
+            # Then the associated sites, service sites and ccTLDs
+            for site in member_sites[primary]:
+                self.error_list.extend(
+                    self.check_site_well_known(primary, site))
+
+    def find_invalid_alias_eSLDs(self, 
+                                 check_sets: dict[str, FpsSet]) -> None:
         """Checks that eSLDs match their alias, and that country codes are 
         members of icann
         Reads the ccTLDs and makes sure that they match their equivalent sites,
@@ -419,161 +576,214 @@ class FpsCheck:
         Returns:
             None
         """
-        for primary in check_sets:
-            curr_set = check_sets[primary]
+        for primary, curr_set in check_sets.items():
             if curr_set.ccTLDs:
+                alias_members = set(curr_set.associated_sites or ()) | set(
+                    curr_set.service_sites or ())
                 for aliased_site in curr_set.ccTLDs:
                     # first check if the aliased site is actually anywhere else
                     # in the fps
                     if aliased_site != primary:
-                        if curr_set.associated_sites:
-                            sites = curr_set.associated_sites 
-                        else:
-                            sites = []
-                        if curr_set.service_sites:
-                            sites += curr_set.service_sites
-                        if aliased_site not in sites:
+                        if aliased_site not in alias_members:
                             self.error_list.append(
-                                "The aliased site " + aliased_site + 
-                                " contained within the ccTLDs must be a " +
-                                "primary, associated site, or service site " +
-                                "within the firsty pary set for " + primary)
+                                f"The aliased site {aliased_site}"
+                                " contained within the ccTLDs must be a "
+                                "primary, associated site, or service site "
+                                f"within the firsty pary set for {primary}")
                     # check the validity of the aliases
                     aliased_domain, aliased_tld = aliased_site.split(".", 1)
+                    icann_check: AbstractSet[str]
                     if aliased_tld in self.icanns:
-                        icann_check = self.icanns.union({"com"})
+                        icann_check = self.icanns_with_com
                     else:
                         icann_check = self.icanns
-                    plus1s = [(site, site.split(".")[0], site.split(".")[-1])
-                              for site in curr_set.ccTLDs[aliased_site]]
-                    for eSLD in plus1s:
-                        if eSLD[1] != aliased_domain:
+                    for site in curr_set.ccTLDs[aliased_site]:
+                        if site.partition(".")[0] != aliased_domain:
                             self.error_list.append(
-                                "The following top level domain must match: " 
-                                + aliased_site + ", but is instead: " 
-                                + eSLD[0])
-                        if eSLD[2] not in icann_check:
+                                "The following top level domain must match: "
+                                f"{aliased_site}, but is instead: {site}")
+                        country_code = site.rpartition(".")[2]
+                        if country_code not in icann_check:
                             self.error_list.append(
-                                "The provided country code: " + eSLD[2] + 
-                                ", in: " + eSLD[0] + 
+                                f"The provided country code: {country_code}"
+                                f", in: {site}"
                                 " is not a ICANN registered country code")
 
+    def all_service_sites(self, check_sets):
+        """Returns a list of the service sites of every FpsSet in check_sets
+
+        Sites listed more than once are only returned once, in the position 
+        they first appear, so that they are only requested once by each check.
+
+        Args:
+            check_sets: a dictionary of primary->FpsSet
+        Returns:
+            a list of domain names
+        """
+        return list(dict.fromkeys(
+            service_site for fps in check_sets.values() 
+            if fps.service_sites for service_site in fps.service_sites))
+
+    def head_or_get(self, url, allow_redirects=True):
+        """Makes a HEAD request to a url, falling back to GET if needed
+
+        The service site checks only look at the status code and headers of a
+        response, so a HEAD request is made to avoid downloading the body. If
+        the server does not allow or does not implement HEAD requests, 
+        answering 405 or 501, a GET request is made instead.
+
+        Args:
+            url: the url to request
+            allow_redirects: whether redirects should be followed
+        Returns:
+            the requests.Response for url
+        """
+        r = self.session.head(url, timeout=10, allow_redirects=allow_redirects)
+        if r.status_code in (405, 501):
+            r = self.session.get(url, timeout=10, 
+                                 allow_redirects=allow_redirects)
+        return r
+
+    def check_service_robots_txt(self, service_site):
+        """Checks a single service site for a robots.txt subdomain
+
+        Args:
+            service_site: the domain name of the service site
+        Returns:
+            a list of the errors found for service_site
+        """
+        robot_site = f"{service_site}/robots.txt"
+        try:
+            r = self.head_or_get(robot_site)
+            if r.status_code == 200:
+                r_service = self.head_or_get(service_site)
+                if 'X-Robots-Tag' not in r_service.headers:
+                    return [f"The service site {service_site} has a "
+                    "robots.txt file, but does not have X-Robots-Tag in its "
+                    "header"]
+                else:
+                    if r_service.headers['X-Robots-Tag'] != 'noindex':
+                        return [
+                            f"The service site {service_site}"
+                            " has a robots.txt file, but does not have"
+                            " a no-index tag in its header"]
+        except (requests.ConnectionError, requests.Timeout):
+            # An unreachable or unresponsive site is expected
+            pass
+        except Exception as inst:
+            return [f"Unexpected error for service site: {service_site}"
+                    f"; Received error:{inst}"]
+        return []
+
     def find_robots_txt(self, check_sets):
         """Checks service sites to see if they have a robots.txt subdomain.
 
 
         Iterates through all service_sites in each FpsSet provided, and makes
-        a get request to site/robots.txt for each. This request should return
+        a head request to site/robots.txt for each. This request should return
         an error 4xx, 5xx, or a timeout error. If it does not, and the page 
         does exist, then it is expected that the site contains a X-Robots-Tag
         in its header. If none of these conditions is met, an error is appended
-        to the error list.
+        to the error list. The sites are checked concurrently.
 
         Args:
             check_sets: a dictionary of primary->FpsSet
         Returns:
             None
         """
-        exception_retries = "Max retries exceeded with url: /robots.txt"
-        exception_timeout = "Read timed out. (read timeout=10)"
-        for primary in check_sets:
-            if not check_sets[primary].service_sites:
-                continue
-            for service_site in check_sets[primary].service_sites:
-                robot_site = service_site + "/robots.txt"
-                try:
-                    r = requests.get(robot_site, timeout=10)
-                    if r.status_code == 200:
-                        r_service = requests.get(service_site, timeout=10)
-                        if 'X-Robots-Tag' not in r_service.headers:
-                            self.error_list.append("The service site " + 
-                            service_site + " has a robots.txt file, " + 
-                            "but does not have " + 
-                            "X-Robots-Tag in its header")
-                        else:
-                            if r_service.headers['X-Robots-Tag'] != 'noindex':
-                                self.error_list.append(
-                                    "The service site " + service_site + 
-                                    " has a robots.txt file, but does not have"
-                                    + " a no-index tag in its header")
-                except Exception as inst:
-                    if exception_retries not in str(inst):
-                        if exception_timeout not in str(inst):
-                            self.error_list.append(
-                                "Unexpected error for service site: " +
-                                    service_site + "; Received error:" + 
-                                    str(inst))
+        for site_errors in self.run_concurrently(
+                self.check_service_robots_txt, 
+                self.all_service_sites(check_sets)):
+            self.error_list.extend(site_errors)
+
+    def check_service_ads_txt(self, service_site):
+        """Checks a single service site for an ads.txt subdomain
+
+        Args:
+            service_site: the domain name of the service site
+        Returns:
+            a list of the errors found for service_site
+        """
+        ads_site = f"{service_site}/ads.txt"
+        try:
+            r = self.head_or_get(ads_site)
+            if r.status_code == 200:
+                return [f"The service site {service_site} has an ads.txt "
+                "file, this violates the policies for service sites"]
+        except (requests.ConnectionError, requests.Timeout):
+            # An unreachable or unresponsive site is expected
+            pass
+        except Exception as inst:
+            return [f"Unexpected error for service site: {service_site}"
+                    f"\nReceived error:{inst}"]
+        return []
 
     def find_ads_txt(self, check_sets):
         """Checks to see if service sites have an ads.txt subdomain. 
 
         Iterates through all service_sites in each FpsSet provided, and makes
-        a get request to site/ads.txt for each. Appends errors to the error 
+        a head request to site/ads.txt for each. Appends errors to the error 
         list for any that do not return an error 4xx or 5xx or if the site
-        does not cause a timeout error. 
+        does not cause a timeout error. The sites are checked concurrently.
 
         Args:
             check_sets: a dictionary of primary->FpsSet
         Returns:
             None
         """
+        for site_errors in self.run_concurrently(
+                self.check_service_ads_txt, 
+                self.all_service_sites(check_sets)):
+            self.error_list.extend(site_errors)
 
-        exception_retries = "Max retries exceeded with url: /ads.txt"
-        exception_timeout = "Read timed out. (read timeout=10)"
-        for primary in check_sets:
-            if not check_sets[primary].service_sites:
-                continue
-            for service_site in check_sets[primary].service_sites:
-                ads_site = service_site + "/ads.txt"
-                try:
-                    r = requests.get(ads_site, timeout=10)
-                    if r.status_code == 200:
-                        self.error_list.append("The service site " + 
-                        service_site + " has an ads.txt file, this violates "
-                        + "the policies for service sites")
-                except Exception as inst:
-                    if exception_retries not in str(inst):
-                        if exception_timeout not in str(inst):
-                            self.error_list.append(
-                                "Unexpected error for service site: " +
-                                service_site + "\nReceived error:" + str(inst))
+    def check_service_site_redirect(self, service_site):
+        """Checks that a single service site redirects or returns an error
+
+        Args:
+            service_site: the domain name of the service site
+        Returns:
+            a list of the errors found for service_site
+        """
+        try:
+            r = self.head_or_get(service_site, allow_redirects=False)
+            # We want the request status_code to be a 4xx or 5xx, raise
+            # an exception if it's outside that range
+            if r.status_code < 400 or r.status_code >= 600:
+                # If a request to a service site successfully connects to 
+                # that site, we expect it to be a redirect to another page
+                # If it is not a redirect, we raise an exception
+                target = service_site
+                if 300 <= r.status_code < 400:
+                    target = urljoin(service_site, 
+                                     r.headers.get('Location', ''))
+                if target == service_site or target == f"{service_site}/":
+                    return [
+                        "The service site must not be an endpoint: "
+                        f"{service_site}"]
+        except (requests.ConnectionError, requests.Timeout):
+            # An unreachable or unresponsive site is expected
+            pass
+        except Exception as inst:
+            return [f"Unexpected error for service site: {service_site}"
+                    f"\nReceived error: {inst}"]
+        return []
 
     def check_for_service_redirect(self, check_sets):
         """Checks to see if service sites redirect to another site
         or return a user/server error.
         
-        Makes a get request to all service sites in each FpsSet contained in 
-        check_sets, and appends errors to the error list for any that do not 
-        return an error 4xx or 5xx or if the site does not cause a timeout 
-        error. 
+        Makes a head request to all service sites in each FpsSet contained in 
+        check_sets, without following redirects, and appends errors to the 
+        error list for any that do not redirect to another page, return an 
+        error 4xx or 5xx, or cause a timeout error. The sites are checked 
+        concurrently.
 
         Args:
             check_sets: a dictionary of primary->FpsSet
         Returns:
             None
         """
-
-        exception_retries = "Max retries exceeded with url: /"
-        exception_timeout = "Read timed out. (read timeout=10)"
-        for primary in check_sets:
-            if not check_sets[primary].service_sites:
-                continue
-            for service_site in check_sets[primary].service_sites:
-                try:
-                    r = requests.get(service_site, timeout=10)
-                    # We want the request status_code to be a 4xx or 5xx, raise
-                    # an exception if it's outside that range
-                    if r.status_code < 400 or r.status_code >= 600:
-                        # If a get request to a service site successfully 
-                        # connects to that site, we expect it to be a redirect
-                        # If it is not a redirect, we raise an exception
-                        if r.url == service_site or r.url == service_site+"/":
-                            self.error_list.append(
-                                "The service site must not be an endpoint: " + 
-                                service_site)
-                except Exception as inst:
-                    if exception_retries not in str(inst):
-                        if exception_timeout not in str(inst):
-                            self.error_list.append("Unexpected error for "
-                            + "service site: " + service_site + 
-                            "\nReceived error: " + str(inst))
+        for site_errors in self.run_concurrently(
+                self.check_service_site_redirect, 
+                self.all_service_sites(check_sets)):
+            self.error_list.extend(site_errors)
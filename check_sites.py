@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from FpsCheck import FpsCheck
-import json
+from FpsCheck import loads_json
 import getopt
 import sys
 import os
@@ -31,9 +31,9 @@ def main():
             inputPrefix = arg
 
     # Open the canonical sites, and load the json
-    with open(inputFile) as f:
+    with open(inputFile, 'rb') as f:
         try:
-            fps_sites = json.load(f)
+            fps_sites = loads_json(f.read())
         except Exception as inst:
         # If the file cannot be loaded, we will not run any other checks
             print(inst)
@@ -1,5 +1,6 @@
 import unittest
 import sys
+import requests
 from jsonschema import ValidationError
 from publicsuffix2 import PublicSuffixList
 from unittest import mock
@@ -7,6 +8,7 @@ from unittest import mock
 sys.path.append('../first-party-sets')
 from FpsSet import FpsSet
 from FpsCheck import FpsCheck
+import FpsCheck as FpsCheck_module
 
 class TestValidateSchema(unittest.TestCase):
     """A test suite for the validate_schema function of FpsCheck"""
@@ -32,7 +34,7 @@ class TestValidateSchema(unittest.TestCase):
         fp = FpsCheck(fps_sites=json_dict,
                       etlds=None, icanns=set(['ca']))
         with self.assertRaises(ValidationError):
-            fp.validate_schema()
+            fp.validate_schema('SCHEMA.json')
 
     def test_no_rationaleBySite(self):
         json_dict = {
@@ -52,7 +54,7 @@ class TestValidateSchema(unittest.TestCase):
         fp = FpsCheck(fps_sites=json_dict,
                       etlds=None, icanns=set(['ca']))
         with self.assertRaises(ValidationError):
-            fp.validate_schema()
+            fp.validate_schema('SCHEMA.json')
 
     def test_invalid_field_type(self):
         json_dict = {
@@ -70,7 +72,7 @@ class TestValidateSchema(unittest.TestCase):
         fp = FpsCheck(fps_sites=json_dict,
                       etlds=None, icanns=set(['ca']))
         with self.assertRaises(ValidationError):
-            fp.validate_schema()
+            fp.validate_schema('SCHEMA.json')
     def test_no_contact(self):
        json_dict = {
             "sets":
@@ -92,7 +94,58 @@ class TestValidateSchema(unittest.TestCase):
        fp = FpsCheck(fps_sites=json_dict,
                       etlds=None, icanns=set(['ca']))
        with self.assertRaises(ValidationError):
-            fp.validate_schema()
+            fp.validate_schema('SCHEMA.json')
+
+    def test_reports_best_match(self):
+        json_dict = {
+            "sets":
+            [
+                {
+                    "primary": 1
+                }
+            ]
+        }
+        fp = FpsCheck(fps_sites=json_dict,
+                      etlds=None, icanns=set(['ca']))
+        with self.assertRaises(ValidationError) as cm:
+            fp.validate_schema('SCHEMA.json')
+        self.assertEqual(cm.exception.message, 
+                         "'contact' is a required property")
+
+    def test_dependent_required(self):
+        json_dict = {
+            "sets":
+            [
+                {
+                    "contact": "abc@example.com",
+                    "primary": "https://primary.com",
+                    "associatedSites": ["https://associated1.com"]
+                }
+            ]
+        }
+        fp = FpsCheck(fps_sites=json_dict,
+                      etlds=None, icanns=set(['ca']))
+        with self.assertRaises(ValidationError) as cm:
+            fp.validate_schema('SCHEMA.json')
+        self.assertEqual(cm.exception.message, 
+                         "'rationaleBySite' is a dependency of " + 
+                         "'associatedSites'")
+
+    @unittest.skipUnless(FpsCheck_module.jsonschema_rs, 
+                         "jsonschema_rs is not installed")
+    def test_native_dependent_required(self):
+        json_dict = {
+            "sets":
+            [
+                {
+                    "contact": "abc@example.com",
+                    "primary": "https://primary.com",
+                    "associatedSites": ["https://associated1.com"]
+                }
+            ]
+        }
+        _, native_validator = FpsCheck.get_schema_validator('SCHEMA.json')
+        self.assertFalse(native_validator.is_valid(json_dict))
 
 class TestLoadSets(unittest.TestCase):
     def test_collision_case(self):
@@ -262,8 +315,8 @@ class TestCheckExclusivity(unittest.TestCase):
         }
         self.assertEqual(loaded_sets, expected_sets)
         self.assertEqual(fp.error_list, 
-         ["These service sites are already registered in another"
-                        + " first party set: {'https://service1.com'}"])
+         ["This service site is already registered in the first party set"
+                        + " for https://primary.com: https://service1.com"])
 
     def test_primary_is_associate(self):
         json_dict = {
@@ -301,8 +354,8 @@ class TestCheckExclusivity(unittest.TestCase):
         }
         self.assertEqual(loaded_sets, expected_sets)
         self.assertEqual(fp.error_list, 
-         ["This primary is already registered in another"
-                        + " first party set: https://primary2.com"])
+         ["This primary is already registered in the first party set"
+                        + " for https://primary.com: https://primary2.com"])
     def test_expected_case(self):
         json_dict = {
             "sets":
@@ -339,6 +392,81 @@ class TestCheckExclusivity(unittest.TestCase):
         }
         self.assertEqual(loaded_sets, expected_sets)
         self.assertEqual(fp.error_list, [])
+
+    def test_single_character_site(self):
+        # Primaries must be registered whole, not character by character
+        json_dict = {
+            "sets":
+            [
+                {
+                    "primary": "https://primary.com",
+                    "associatedSites": ["https://associated1.com"],
+                    "rationaleBySite": {}
+                },
+                {
+                    "primary": "https://primary2.com",
+                    "associatedSites": ["p"],
+                    "rationaleBySite": {}
+                }
+            ]
+        }
+        fp = FpsCheck(fps_sites=json_dict,
+                      etlds=None,
+                       icanns=set())
+        loaded_sets = fp.load_sets()
+        fp.check_exclusivity(loaded_sets)
+        self.assertEqual(fp.error_list, [])
+
+    def test_site_repeated_in_same_set(self):
+        json_dict = {
+            "sets":
+            [
+                {
+                    "primary": "https://primary.com",
+                    "associatedSites": ["https://associated1.com"],
+                    "serviceSites": ["https://associated1.com"],
+                    "ccTLDs": {
+                        "https://primary.com": ["https://associated1.com"]
+                    },
+                    "rationaleBySite": {}
+                }
+            ]
+        }
+        fp = FpsCheck(fps_sites=json_dict,
+                      etlds=None,
+                       icanns=set())
+        loaded_sets = fp.load_sets()
+        fp.check_exclusivity(loaded_sets)
+        self.assertEqual(fp.error_list, 
+         ["This service site is already listed in the same first party set"
+                        + " (associated site): https://associated1.com",
+          "This ccTLD site is already listed in the same first party set"
+                        + " (associated site): https://associated1.com"])
+
+    def test_associate_is_earlier_primary(self):
+        json_dict = {
+            "sets":
+            [
+                {
+                    "primary": "https://primary.com",
+                    "associatedSites": ["https://associated1.com"],
+                    "rationaleBySite": {}
+                },
+                {
+                    "primary": "https://primary2.com",
+                    "associatedSites": ["https://primary.com"],
+                    "rationaleBySite": {}
+                }
+            ]
+        }
+        fp = FpsCheck(fps_sites=json_dict,
+                      etlds=None,
+                       icanns=set())
+        loaded_sets = fp.load_sets()
+        fp.check_exclusivity(loaded_sets)
+        self.assertEqual(fp.error_list, 
+         ["This associated site is already registered in the first party set"
+                        + " for https://primary.com: https://primary.com"])
     
 class TestFindNonHttps(unittest.TestCase):
     def test_no_https_in_primary(self):
@@ -545,6 +673,31 @@ class TestFindInvalidETLD(unittest.TestCase):
                     " Public suffix list: https://associated1.c2om",
           "The provided service site does not have an eTLD in the" +
                     " Public suffix list: https://service1.c2om"])
+
+    def test_repeated_site_looked_up_once(self):
+        json_dict = {
+            "sets":
+            [
+                {
+                    "primary": "https://primary.com",
+                    "associatedSites": ["https://associated1.com"],
+                    "ccTLDs": {
+                        "https://primary.com": ["https://primary.com"]
+                    },
+                    "rationaleBySite": {}
+                }
+            ]
+        }
+        etlds = PublicSuffixList(psl_file = 'effective_tld_names.dat')
+        fp = FpsCheck(fps_sites=json_dict,
+                     etlds=etlds,
+                     icanns=set())
+        loaded_sets = fp.load_sets()
+        with mock.patch.object(etlds, 'get_public_suffix', 
+                               wraps=etlds.get_public_suffix) as lookup:
+            fp.find_invalid_eTLD_Plus1(loaded_sets)
+        self.assertEqual(lookup.call_count, 2)
+        self.assertEqual(fp.error_list, [])
         
 class TestFindInvalidESLDs(unittest.TestCase):
     def test_invalid_alias_name(self):
@@ -703,6 +856,41 @@ class TestFindInvalidESLDs(unittest.TestCase):
         self.assertEqual(loaded_sets, expected_sets)
         self.assertEqual(fp.error_list, [])
 
+    def test_member_lists_unchanged(self):
+        json_dict = {
+            "sets":
+            [
+                {
+                    "primary": "https://primary.com",
+                    "associatedSites": ["https://associated1.com"],
+                    "serviceSites": ["https://service1.com"],
+                    "ccTLDs": {
+                        "https://associated1.com": ["https://associated1.ca"],
+                        "https://service1.com": ["https://service1.ca"]
+                    }
+                }
+            ]
+        }
+        fp = FpsCheck(fps_sites=json_dict,
+                     etlds=None,
+                     icanns=set(["ca"]))
+        loaded_sets = fp.load_sets()
+        fp.find_invalid_alias_eSLDs(loaded_sets)
+        expected_sets = {
+            'https://primary.com': 
+            FpsSet(
+                    primary="https://primary.com", 
+                    associated_sites=["https://associated1.com"],
+                    service_sites=["https://service1.com"],
+                    ccTLDs={
+                        "https://associated1.com": ["https://associated1.ca"],
+                        "https://service1.com": ["https://service1.ca"]
+                    }
+                    )
+        }
+        self.assertEqual(loaded_sets, expected_sets)
+        self.assertEqual(fp.error_list, [])
+
 # This method will be used in tests below to mock get requests
 def mock_get(*args, **kwargs):
     class MockedGetResponse:
@@ -725,11 +913,35 @@ def mock_get(*args, **kwargs):
         mgr = MockedGetResponse({}, 200)
         mgr.url = 'https://example.com'
         return mgr
+    elif args[0] == 'https://service8.com/ads.txt':
+        raise requests.ConnectionError("Failed to resolve service8.com")
+    elif args[0] == 'https://service9.com/ads.txt':
+        raise requests.TooManyRedirects("Exceeded 30 redirects.")
     elif args[0].startswith('https://service'):
         return MockedGetResponse({},200)
     
     return MockedGetResponse(None, 404)
 
+# This method will be used in tests below to mock head requests. Head requests
+# that do not follow redirects see the redirect itself rather than its target
+def mock_head(*args, **kwargs):
+    if args[0] == 'https://service7.com':
+        mgr = mock_get(*args, **kwargs)
+        mgr.status_code = 405
+        return mgr
+    if args[0] == 'https://service10.com':
+        mgr = mock_get(*args, **kwargs)
+        mgr.status_code = 501
+        return mgr
+    if args[0] == 'https://service6.com' and not kwargs.get(
+        'allow_redirects', True):
+        mgr = mock_get(*args, **kwargs)
+        mgr.status_code = 301
+        mgr.headers = {'Location': mgr.url}
+        mgr.url = args[0]
+        return mgr
+    return mock_get(*args, **kwargs)
+
 def mock_open_and_load_json(*args, **kwargs):
     class MockedJsonResponse:
         def __init__(self, json):
@@ -776,11 +988,11 @@ def mock_open_and_load_json(*args, **kwargs):
 # Our test case class
 class MockTestsClass(unittest.TestCase):
 
-    # We patch requests.get with our mocked method. We'll pass
+    # We patch requests.Session.head with our mocked method. We'll pass
     # in the relevant urls, and get our responses for robots checks
-    @mock.patch('requests.get', side_effect=mock_get)
-    def test_robots(self, mock_get):
-        # Assert requests.get calls
+    @mock.patch('requests.Session.head', side_effect=mock_head)
+    def test_robots(self, mock_head):
+        # Assert requests.Session.head calls
         json_dict = {
             "sets":
             [
@@ -808,9 +1020,9 @@ class MockTestsClass(unittest.TestCase):
         self.assertEqual(fp.error_list, ["The service site " +
         "https://service1.com has a robots.txt file, but " +
         "does not have X-Robots-Tag in its header"])
-    @mock.patch('requests.get', side_effect=mock_get)
-    def test_robots_wrong_tag(self, mock_get):
-        # Assert requests.get calls
+    @mock.patch('requests.Session.head', side_effect=mock_head)
+    def test_robots_wrong_tag(self, mock_head):
+        # Assert requests.Session.head calls
         json_dict = {
             "sets":
             [
@@ -838,9 +1050,9 @@ class MockTestsClass(unittest.TestCase):
         self.assertEqual(fp.error_list, ["The service site " +
         "https://service2.com has a robots.txt file, but " +
         "does not have a no-index tag in its header"])
-    @mock.patch('requests.get', side_effect=mock_get)
-    def test_robots_expected_tag(self, mock_get):
-        # Assert requests.get calls
+    @mock.patch('requests.Session.head', side_effect=mock_head)
+    def test_robots_expected_tag(self, mock_head):
+        # Assert requests.Session.head calls
         json_dict = {
             "sets":
             [
@@ -867,9 +1079,9 @@ class MockTestsClass(unittest.TestCase):
         self.assertEqual(loaded_sets, expected_sets)
         self.assertEqual(fp.error_list, [])
 
-    @mock.patch('requests.get', side_effect=mock_get)
-    def test_robots_wrong_tag(self, mock_get):
-        # Assert requests.get calls
+    @mock.patch('requests.Session.head', side_effect=mock_head)
+    def test_robots_wrong_tag(self, mock_head):
+        # Assert requests.Session.head calls
         json_dict = {
             "sets":
             [
@@ -895,10 +1107,37 @@ class MockTestsClass(unittest.TestCase):
         }
         self.assertEqual(loaded_sets, expected_sets)
         self.assertEqual(fp.error_list, [])
+    @mock.patch('requests.Session.head', side_effect=mock_head)
+    def test_robots_multiple_sets(self, mock_head):
+        # The sites are fetched concurrently, but errors keep the list order
+        json_dict = {
+            "sets":
+            [
+                {
+                    "primary": "https://primary.com",
+                    "serviceSites": ["https://service1.com", 
+                    "https://service4.com"]
+                },
+                {
+                    "primary": "https://primary2.com",
+                    "serviceSites": ["https://service2.com"]
+                }
+            ]
+        }
+        fp = FpsCheck(fps_sites=json_dict,
+                     etlds=None,
+                     icanns=set())
+        loaded_sets = fp.load_sets()
+        fp.find_robots_txt(loaded_sets)
+        self.assertEqual(fp.error_list, ["The service site " +
+        "https://service1.com has a robots.txt file, but " +
+        "does not have X-Robots-Tag in its header", "The service site " + 
+        "https://service2.com has a robots.txt file, but does not have a " +
+        "no-index tag in its header"])
     # We run a similar set of mock tests for ads.txt
-    @mock.patch('requests.get', side_effect=mock_get)
-    def test_ads(self, mock_get):
-        # Assert requests.get calls
+    @mock.patch('requests.Session.head', side_effect=mock_head)
+    def test_ads(self, mock_head):
+        # Assert requests.Session.head calls
         json_dict = {
             "sets":
             [
@@ -926,9 +1165,9 @@ class MockTestsClass(unittest.TestCase):
         self.assertEqual(fp.error_list, ["The service site " +
         "https://service1.com has an ads.txt file, this " +
         "violates the policies for service sites"])
-    @mock.patch('requests.get', side_effect=mock_get)
-    def test_ads(self, mock_get):
-        # Assert requests.get calls
+    @mock.patch('requests.Session.head', side_effect=mock_head)
+    def test_ads(self, mock_head):
+        # Assert requests.Session.head calls
         json_dict = {
             "sets":
             [
@@ -954,10 +1193,54 @@ class MockTestsClass(unittest.TestCase):
         }
         self.assertEqual(loaded_sets, expected_sets)
         self.assertEqual(fp.error_list, [])
+    @mock.patch('requests.Session.head', side_effect=mock_head)
+    def test_ads_request_errors(self, mock_head):
+        # Unreachable sites are expected, other request errors are reported
+        json_dict = {
+            "sets":
+            [
+                {
+                    "primary": "https://primary.com",
+                    "serviceSites": ["https://service8.com", 
+                    "https://service9.com"]
+                }
+            ]
+        }
+        fp = FpsCheck(fps_sites=json_dict,
+                     etlds=None,
+                     icanns=set())
+        loaded_sets = fp.load_sets()
+        fp.find_ads_txt(loaded_sets)
+        self.assertEqual(fp.error_list, ["Unexpected error for service " +
+        "site: https://service9.com\nReceived error:Exceeded 30 redirects."])
+    @mock.patch('requests.Session.head', side_effect=mock_head)
+    def test_ads_repeated_service_site(self, mock_head):
+        json_dict = {
+            "sets":
+            [
+                {
+                    "primary": "https://primary.com",
+                    "serviceSites": ["https://service1.com"]
+                },
+                {
+                    "primary": "https://primary2.com",
+                    "serviceSites": ["https://service1.com"]
+                }
+            ]
+        }
+        fp = FpsCheck(fps_sites=json_dict,
+                     etlds=None,
+                     icanns=set())
+        loaded_sets = fp.load_sets()
+        fp.find_ads_txt(loaded_sets)
+        mock_head.assert_called_once()
+        self.assertEqual(fp.error_list, ["The service site " + 
+        "https://service1.com has an ads.txt file, this violates the " + 
+        "policies for service sites"])
     # We run a similar set of mock tests for redirect check
-    @mock.patch('requests.get', side_effect=mock_get)
-    def test_non_redirect(self, mock_get):
-        # Assert requests.get calls
+    @mock.patch('requests.Session.head', side_effect=mock_head)
+    def test_non_redirect(self, mock_head):
+        # Assert requests.Session.head calls
         json_dict = {
             "sets":
             [
@@ -984,9 +1267,9 @@ class MockTestsClass(unittest.TestCase):
         self.assertEqual(loaded_sets, expected_sets)
         self.assertEqual(fp.error_list, ["The service site " +
         "must not be an endpoint: https://service1.com"])
-    @mock.patch('requests.get', side_effect=mock_get)
-    def test_proper_redirect(self, mock_get):
-        # Assert requests.get calls
+    @mock.patch('requests.Session.head', side_effect=mock_head)
+    def test_proper_redirect(self, mock_head):
+        # Assert requests.Session.head calls
         json_dict = {
             "sets":
             [
@@ -1012,9 +1295,9 @@ class MockTestsClass(unittest.TestCase):
         }
         self.assertEqual(loaded_sets, expected_sets)
         self.assertEqual(fp.error_list, [])
-    @mock.patch('requests.get', side_effect=mock_get)
-    def test_404_redirect(self, mock_get):
-        # Assert requests.get calls
+    @mock.patch('requests.Session.head', side_effect=mock_head)
+    def test_404_redirect(self, mock_head):
+        # Assert requests.Session.head calls
         json_dict = {
             "sets":
             [
@@ -1040,6 +1323,32 @@ class MockTestsClass(unittest.TestCase):
         }
         self.assertEqual(loaded_sets, expected_sets)
         self.assertEqual(fp.error_list, [])
+    @mock.patch('requests.Session.get', side_effect=mock_get)
+    @mock.patch('requests.Session.head', side_effect=mock_head)
+    def test_head_not_allowed_redirect(self, mock_head, mock_get):
+        json_dict = {
+            "sets":
+            [
+                {
+                    "primary": "https://primary.com",
+                    "serviceSites": ["https://service7.com", 
+                    "https://service10.com"]
+                }
+            ]
+        }
+        fp = FpsCheck(fps_sites=json_dict,
+                     etlds=None,
+                     icanns=set())
+        loaded_sets = fp.load_sets()
+        fp.check_for_service_redirect(loaded_sets)
+        self.assertEqual(mock_get.call_count, 2)
+        mock_get.assert_any_call('https://service7.com', timeout=10, 
+                                 allow_redirects=False)
+        mock_get.assert_any_call('https://service10.com', timeout=10, 
+                                 allow_redirects=False)
+        self.assertEqual(fp.error_list, ["The service site must not be an " +
+        "endpoint: https://service7.com", "The service site must not be " +
+        "an endpoint: https://service10.com"])
     # Now we test the mocked open_and_load_json to test the well-known checks
     @mock.patch('FpsCheck.FpsCheck.open_and_load_json', 
     side_effect=mock_open_and_load_json)
@@ -1165,5 +1474,55 @@ class MockTestsClass(unittest.TestCase):
         self.assertEqual(loaded_sets, expected_sets)
         self.assertEqual(fp.error_list, [])
 
+    @mock.patch('FpsCheck.FpsCheck.open_and_load_json', 
+    side_effect=mock_open_and_load_json)
+    def test_ccTLD_sites_checked_once(self, mock_open_and_load_json):
+        json_dict = {
+            "sets":
+            [
+                {
+                    "primary": "https://primary4.com",
+                    "associatedSites": ["https://associated3.com"],
+                    "ccTLDs": {
+                        "https://primary4.com": ["https://primary4.ca"],
+                        "https://associated3.com": ["https://associated3.ca"]
+                    }
+                }
+            ]
+        }
+        fp = FpsCheck(fps_sites=json_dict,
+                     etlds=None,
+                     icanns=set(['ca']))
+        loaded_sets = fp.load_sets()
+        fp.find_invalid_well_known(loaded_sets)
+        self.assertEqual(fp.error_list, ["The listed associated site "
+                + "did not have https://primary4.com listed as its primary: " 
+                + "https://primary4.ca", "The listed associated site "
+                + "did not have https://primary4.com listed as its primary: " 
+                + "https://associated3.ca"])
+
+    @mock.patch('FpsCheck.FpsCheck.open_and_load_json', 
+    side_effect=mock_open_and_load_json)
+    def test_well_known_fetched_once(self, mock_open_and_load_json):
+        json_dict = {
+            "sets":
+            [
+                {
+                    "primary": "https://primary3.com",
+                    "associatedSites": ["https://associated2.com"]
+                }
+            ]
+        }
+        fp = FpsCheck(fps_sites=json_dict,
+                     etlds=None,
+                     icanns=set())
+        loaded_sets = fp.load_sets()
+        fp.find_invalid_well_known(loaded_sets)
+        fp.find_invalid_well_known(loaded_sets)
+        self.assertEqual(mock_open_and_load_json.call_count, 2)
+        self.assertEqual(fp.error_list, 2 * ["The listed associated site "
+                + "did not have https://primary3.com listed as its primary: " 
+                + "https://associated2.com"])
+
 if __name__ == '__main__':
     unittest.main()